@@ -1,18 +1,113 @@
-from websocket import WebSocketApp
-import json
+# websocket-client uses wsaccel (pip install wsaccel), when installed, for C frame masking and UTF-8 validation.
+from websocket import ABNF, WebSocketApp, WebSocketConnectionClosedException
+import orjson
 import qrcode
+import io
 import sys
-from datetime import datetime
-import pytz
+import threading
+import time
+from functools import lru_cache
+from itertools import islice
+
+try:
+    import ijson  # Optional: streams very large group histories instead of parsing them whole
+except ImportError:
+    ijson = None
+
+# The pure-Python ijson backend is far slower than orjson; only stream with a C backend
+if ijson is not None and ijson.backend not in ("yajl2_c", "yajl2_cffi"):
+    ijson = None
+
+_STREAM_ERRORS = (ijson.JSONError,) if ijson is not None else ()
+
+_loads = orjson.loads
+_dumps = orjson.dumps
+
+FLUSH_INTERVAL = 0.02  # Seconds to coalesce outbound requests before writing a frame
+MAX_PENDING = 128  # Flush immediately once this many requests are queued
+STREAM_THRESHOLD = 256 * 1024  # Frames larger than this are stream-decoded when possible
+_GROUP_MESSAGES_MARKER = b'"event":"group_messages"'
+_GROUP_MESSAGES_MARKER_TEXT = _GROUP_MESSAGES_MARKER.decode()
+
+# Pre-encoded JSON event names for outbound requests
+_EV_INITIATE = b'"initiate"'
+_EV_GET_GROUPS = b'"get_groups"'
+_EV_GET_MESSAGES = b'"get_messages"'
+_EV_GET_GROUP_MESSAGES = b'"get_group_messages"'
+_EV_SEND_MESSAGE = b'"send_message"'
+_EV_DISCONNECT = b'"disconnect"'
+
+_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_MENU = (
+    "\n📌 Choose an action:\n"
+    "1️⃣ Get Messages (Wait for new messages)\n"
+    "2️⃣ Fetch Groups\n"
+    "3️⃣ Fetch Messages from a Group\n"
+    "4️⃣ Send a Message\n"
+    "5️⃣ Disconnect"
+)
+
+
+@lru_cache(maxsize=4096)
+def _fmt_seconds(seconds):
+    """Formats a Unix timestamp in seconds; cached since bursts share the same second."""
+    return time.strftime(_TIMESTAMP_FORMAT, time.localtime(seconds))
+
+
+def _fmt_ts(ts_ms):
+    """Formats a millisecond Unix timestamp."""
+    return _fmt_seconds(ts_ms // 1000)
+
+
+def _format_message(msg, _get=dict.get):
+    """Formats a single message as a display line."""
+    sender = _get(msg, "sender") or "Unknown Sender"
+    body = _get(msg, "body") or "No Content"
+    return f"📆 [{_fmt_ts(msg['timestamp'])}] 👤 {sender}: {body}"
+
+
+def _trim_preview(value, depth=3, items=5):
+    """Trims nested containers and strings so serializing a preview stays cheap."""
+    if isinstance(value, dict):
+        if depth == 0:
+            return "{...}"
+        return {k: _trim_preview(v, depth - 1, items) for k, v in islice(value.items(), items)}
+    if isinstance(value, list):
+        if depth == 0:
+            return "[...]"
+        return [_trim_preview(v, depth - 1, items) for v in value[:items]]
+    if isinstance(value, str):
+        return value[:100]
+    return value
 
 
 class WSAppClient:
-    def __init__(self, server_url):
+    def __init__(self, server_url, verbose=True):
         self.server_url = server_url
+        self.verbose = verbose  # Print request send logs; disable for scripted use
         self.user_id = None
         self.ws = None  # WebSocket instance
-        self.groups = []  # Store fetched groups
+        self._group_names = []  # Fetched group names, parallel to _group_ids
+        self._group_ids = []  # Fetched group IDs in display order
+        self._group_lines = []  # Preformatted "  <n>. <name> (ID: <id>)" line per group
         self.waiting_for_messages = False  # Flag to keep waiting for messages when option 1 is selected
+        self._qr = qrcode.QRCode(box_size=2, border=1)  # Reused across QR events; small box_size shrinks the QR code
+        self._pending = []  # Serialized requests waiting for the next flush
+        self._pending_lock = threading.Lock()
+        self._send_lock = threading.Lock()  # Held across swap and send so batches go out in queue order
+        self._flush_handle = None  # Timer for the scheduled flush, if any
+        self._uid_prefix = b""  # Serialized '{"user_id":...' prefix shared by every request
+        self._prompt_event = threading.Event()  # Set by the reader thread when the menu should be shown
+        self._handlers = {  # Inbound event name -> handler
+            "qr": self._h_qr,
+            "ready": self._h_ready,
+            "group_list": self._h_group_list,
+            "group_messages": self._h_group_messages,
+            "message": self._h_message,
+            "message_sent": self._h_message_sent,
+            "disconnected": self._h_disconnected,
+        }
 
     def on_open(self, ws):
         """Handles WebSocket connection open event."""
@@ -23,142 +118,204 @@ class WSAppClient:
         self.user_id = input(f"Enter your user ID (default: {default_user_id}): ") or default_user_id
 
         if self.user_id:
-            initiate_request = {
-                "user_id": self.user_id,
-                "event": "initiate"
-            }
-            ws.send(json.dumps(initiate_request))
-            print(f"📤 Sent initiate request: {initiate_request}")
+            self._uid_prefix = _dumps({"user_id": self.user_id})[:-1]
+            initiate_request = self._emit(_EV_INITIATE)
+            self._enqueue(initiate_request)
+            self._log(f"📤 Sent initiate request: {initiate_request.decode()}")
         else:
             print("❌ User ID cannot be empty.")
             ws.close()
 
+    def _log(self, message):
+        """Prints a request log line when running verbosely."""
+        if self.verbose:
+            print(message)
+
+    def _emit(self, event, **fields):
+        """Builds a serialized request for this user from the cached user_id prefix and a pre-encoded event."""
+        payload = self._uid_prefix + b',"event":' + event
+        if fields:
+            payload += b"," + _dumps(fields)[1:-1]
+        return payload + b"}"
+
+    def _enqueue(self, payload):
+        """Queues a serialized request and schedules a coalesced write."""
+        with self._pending_lock:
+            self._pending.append(payload)
+            if len(self._pending) >= MAX_PENDING:
+                flush_now = True
+            else:
+                flush_now = False
+                if self._flush_handle is None:
+                    self._flush_handle = threading.Timer(FLUSH_INTERVAL, self._flush)
+                    self._flush_handle.daemon = True
+                    self._flush_handle.start()
+        if flush_now:
+            self._flush()
+
+    def _flush(self):
+        """Writes all queued requests as a single frame (newline-delimited JSON when batched)."""
+        with self._send_lock:
+            with self._pending_lock:
+                pending, self._pending = self._pending, []
+                if self._flush_handle is not None:
+                    self._flush_handle.cancel()
+                    self._flush_handle = None
+            if not pending or not self.ws:
+                return
+            payload = pending[0] if len(pending) == 1 else b"\n".join(pending) + b"\n"
+            try:
+                # Binary frames skip text re-encoding; the server JSON.parse()s the raw buffer either way.
+                self.ws.send(payload, opcode=ABNF.OPCODE_BINARY)
+            except WebSocketConnectionClosedException:
+                print(f"❌ Connection closed; {len(pending)} queued request(s) were not sent.")
+
     def on_message(self, ws, message):
         """Handles incoming messages from the WebSocket server."""
         try:
-            data = json.loads(message)
+            if ijson is not None and len(message) > STREAM_THRESHOLD:
+                is_text = isinstance(message, str)
+                marker = _GROUP_MESSAGES_MARKER_TEXT if is_text else _GROUP_MESSAGES_MARKER
+                if marker in message[:128]:
+                    raw = message.encode() if is_text else message
+                    print("\n📩 Message received from server:")
+                    print("🔹 Event: group_messages")
+                    try:
+                        self.stream_group_messages(ijson.items(io.BytesIO(raw), "messages.item"))
+                    finally:
+                        self._prompt_event.set()
+                    return
+
+            data = _loads(message)
             event = data.get("event", "UNKNOWN_EVENT")
             event_data = data.get("data", data)  # Fallback to full data if "data" key is missing
 
             print(f"\n📩 Message received from server:")
             print(f"🔹 Event: {event}")
 
-            if event == "qr":
-                qr_code_data = data.get("qr_code")
-                if qr_code_data:
-                    print("\n🔹 QR Code Received! Scan it to connect WhatsApp.")
-                    self.display_qr_code(qr_code_data)
-
-            elif event == "ready":
-                print("✅ WhatsApp client is ready!")
-                self.prompt_user_action()
-
-            elif event == "group_list":
-                self.groups = event_data.get("groups", []) if isinstance(event_data, dict) else []
-                self.display_groups(self.groups)
-                self.prompt_user_action()
-
-            elif event == "group_messages":
-                self.display_group_messages(event_data)
-                self.prompt_user_action()
-
-            elif event == "message":
-                message = data.get("message")
-                self.display_message(message)
-                self.prompt_user_action()
-
-            elif event == "message_sent":
-                print(f"✅ Message sent successfully to {event_data.get('recipientId', 'Unknown')}.")
-                self.prompt_user_action()
-
-            elif event == "disconnected":
-                print("✅ Disconnected from the server. Exiting...")
-                ws.close()
-                exit(0)
-
-            else:
-                print(f"🔹 Data: {json.dumps(event_data, indent=2)[:100]}...")  # Truncated for readability
+            handler = self._handlers.get(event, self._h_default)
+            handler(data, event_data)
 
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             print("❌ Received non-JSON message:", message)
+        except _STREAM_ERRORS as e:
+            print(f"\n❌ Failed to decode group messages: {e}")
+
+    def _h_qr(self, data, event_data):
+        """Renders the WhatsApp pairing QR code."""
+        qr_code_data = data.get("qr_code")
+        if qr_code_data:
+            print("\n🔹 QR Code Received! Scan it to connect WhatsApp.")
+            self.display_qr_code(qr_code_data)
+
+    def _h_ready(self, data, event_data):
+        """Handles the WhatsApp client becoming ready."""
+        print("✅ WhatsApp client is ready!")
+        self._prompt_event.set()
+
+    def _h_group_list(self, data, event_data):
+        """Caches and displays the fetched group list."""
+        groups = event_data.get("groups", []) if isinstance(event_data, dict) else []
+        self._group_names = [g.get("name", "Unknown") for g in groups]
+        self._group_ids = [g.get("id", "N/A") for g in groups]
+        self._group_lines = [f"  {i}. {name} (ID: {group_id})"
+                             for i, (name, group_id) in enumerate(zip(self._group_names, self._group_ids), start=1)]
+        self.display_groups()
+        self._prompt_event.set()
+
+    def _h_group_messages(self, data, event_data):
+        """Displays messages fetched from a group."""
+        self.display_group_messages(event_data)
+        self._prompt_event.set()
+
+    def _h_message(self, data, event_data):
+        """Displays a newly received message."""
+        self.display_message(data.get("message"))
+        self._prompt_event.set()
+
+    def _h_message_sent(self, data, event_data):
+        """Confirms a message was sent."""
+        print(f"✅ Message sent successfully to {event_data.get('recipientId', 'Unknown')}.")
+        self._prompt_event.set()
+
+    def _h_disconnected(self, data, event_data):
+        """Closes the connection and exits after a disconnect."""
+        print("✅ Disconnected from the server. Exiting...")
+        self.ws.close()
+        exit(0)
+
+    def _h_default(self, data, event_data):
+        """Prints a preview of an unrecognized event."""
+        # Trim before serializing; only the first 100 characters are shown anyway
+        preview = _trim_preview(event_data)
+        print(f"🔹 Data: {orjson.dumps(preview, option=orjson.OPT_INDENT_2)[:100].decode(errors='ignore')}...")  # Truncated for readability
+
+    def _prompt_loop(self):
+        """Shows the menu whenever requested, keeping stdin reads off the WebSocket reader thread."""
+        while True:
+            self._prompt_event.wait()
+            self._prompt_event.clear()
+            self.prompt_user_action()
 
     def prompt_user_action(self):
         """Prompt the user to choose an action."""
-        print("\n📌 Choose an action:")
-        print("1️⃣ Get Messages (Wait for new messages)")
-        print("2️⃣ Fetch Groups")
-        print("3️⃣ Fetch Messages from a Group")
-        print("4️⃣ Send a Message")
-        print("5️⃣ Disconnect")
-
-        choice = input("Enter your choice (1-5): ").strip()
-        if choice == "1":
-            self.waiting_for_messages = True  # Keep waiting for new messages
-            self.request_messages()
-        elif choice == "2":
-            self.request_groups()
-        elif choice == "3":
-            self.request_group_messages()
-        elif choice == "4":
-            self.send_message()
-        elif choice == "5":
-            self.request_disconnect()
-        else:
-            print("❌ Invalid choice. Please try again.")
-            self.prompt_user_action()
+        while True:
+            print(_MENU)
+
+            choice = input("Enter your choice (1-5): ").strip()
+            if choice == "1":
+                self.waiting_for_messages = True  # Keep waiting for new messages
+                self.request_messages()
+            elif choice == "2":
+                self.request_groups()
+            elif choice == "3":
+                self.request_group_messages()
+            elif choice == "4":
+                self.send_message()
+            elif choice == "5":
+                self.request_disconnect()
+            else:
+                print("❌ Invalid choice. Please try again.")
+                continue
+            return
 
     def request_groups(self):
         """Sends a request to fetch the user's WhatsApp groups."""
         if self.ws and self.user_id:
-            group_request = {
-                "user_id": self.user_id,
-                "event": "get_groups"
-            }
-            self.ws.send(json.dumps(group_request))
-            print("📤 Requesting WhatsApp groups...")
+            self._enqueue(self._emit(_EV_GET_GROUPS))
+            self._log("📤 Requesting WhatsApp groups...")
 
     def request_messages(self):
         """Sends a request to fetch the user's WhatsApp groups."""
         if self.ws and self.user_id:
-            group_request = {
-                "user_id": self.user_id,
-                "event": "get_messages"
-            }
-            self.ws.send(json.dumps(group_request))
-            print("📤 Requesting WhatsApp messages...")
+            self._enqueue(self._emit(_EV_GET_MESSAGES))
+            self._log("📤 Requesting WhatsApp messages...")
 
     def request_group_messages(self):
         """Prompts user to select a group and request messages."""
-        if not self.groups:
+        if not self._group_ids:
             print("❌ No groups found. Fetch groups first.")
             self.request_groups()
             return
 
-        print("\n📌 Select a group to fetch messages:")
-        for i, group in enumerate(self.groups, start=1):
-            print(f"{i}. {group.get('name', 'Unknown')} (ID: {group.get('id', 'N/A')})")
+        sys.stdout.write("\n📌 Select a group to fetch messages:\n" + "\n".join(self._group_lines) + "\n")
 
         choice = input("Enter group number: ").strip()
         try:
             choice = int(choice) - 1
-            if 0 <= choice < len(self.groups):
-                group_id = self.groups[choice]["id"]
+            if 0 <= choice < len(self._group_ids):
+                group_id = self._group_ids[choice]
                 start_time = input("Enter start time (YYYY-MM-DD HH:MM:SS) or leave empty for recent messages: ").strip()
                 end_time = input("Enter end time (YYYY-MM-DD HH:MM:SS) or leave empty: ").strip()
 
-                request_payload = {
-                    "user_id": self.user_id,
-                    "event": "get_group_messages",
-                    "group_id": group_id
-                }
-
+                time_range = {}
                 if start_time:
-                    request_payload["startTime"] = start_time
+                    time_range["startTime"] = start_time
                 if end_time:
-                    request_payload["endTime"] = end_time
+                    time_range["endTime"] = end_time
 
-                self.ws.send(json.dumps(request_payload))
-                print(f"📤 Requesting messages from group {group_id}...")
+                self._enqueue(self._emit(_EV_GET_GROUP_MESSAGES, group_id=group_id, **time_range))
+                self._log(f"📤 Requesting messages from group {group_id}...")
             else:
                 print("❌ Invalid group selection.")
         except ValueError:
@@ -176,69 +333,60 @@ class WSAppClient:
             print("❌ Message cannot be empty.")
             return
 
-        message_request = {
-            "user_id": self.user_id,
-            "event": "send_message",
-            "recipient": recipient,
-            "message": message
-        }
-        self.ws.send(json.dumps(message_request))
-        print(f"📤 Sending message to {recipient}...")
+        self._enqueue(self._emit(_EV_SEND_MESSAGE, recipient=recipient, message=message))
+        self._log(f"📤 Sending message to {recipient}...")
 
     def request_disconnect(self):
         """Sends a request to disconnect."""
         if self.ws and self.user_id:
-            disconnect_request = {
-                "user_id": self.user_id,
-                "event": "disconnect"
-            }
-            self.ws.send(json.dumps(disconnect_request))
-            print("📤 Sent disconnect request.")
+            self._enqueue(self._emit(_EV_DISCONNECT))
+            self._log("📤 Sent disconnect request.")
 
     def display_group_messages(self, data):
         """Displays messages from a WhatsApp group."""
-        print("\n📥 Group Messages:")
         messages = data.get("messages", [])
         if messages:
-            for msg in messages:
-                timestamp = datetime.fromtimestamp(msg["timestamp"] / 1000).strftime('%Y-%m-%d %H:%M:%S')
-                sender = msg.get("sender", "Unknown Sender")
-                body = msg.get("body", "No Content")
-                print(f"📆 [{timestamp}] 👤 {sender}: {body}")
+            lines = [_format_message(msg) for msg in messages]
         else:
-            print("❌ No messages found.")
+            lines = ["❌ No messages found."]
+        sys.stdout.write("\n📥 Group Messages:\n" + "\n".join(lines) + "\n")
+
+    def stream_group_messages(self, messages):
+        """Displays group messages as they are decoded from a large frame."""
+        write = sys.stdout.write
+        write("\n📥 Group Messages:\n")
+        found = False
+        for msg in messages:
+            found = True
+            write(_format_message(msg) + "\n")
+        if not found:
+            write("❌ No messages found.\n")
 
     def display_message(self, data):
         """Displays messages from a WhatsApp group."""
         print("\n📥 message:")
-        
-        timestamp = datetime.fromtimestamp(data["timestamp"] / 1000).strftime('%Y-%m-%d %H:%M:%S')
-        sender = data.get("sender", "Unknown Sender")
-        body = data.get("body", "No Content")
-        print(f"📆 [{timestamp}] 👤 {sender}: {body}")
-        
-
-    def display_groups(self, groups):
+        print(_format_message(data))
+
+    def display_groups(self):
         """Displays the fetched WhatsApp groups."""
-        print("\n📂 WhatsApp Groups List:")
-        if groups:
-            for i, group in enumerate(groups, start=1):
-                print(f"  {i}. {group.get('name', 'Unknown')} (ID: {group.get('id', 'N/A')})")
-        else:
-            print("  ❌ No groups found.")
+        body = "\n".join(self._group_lines) or "  ❌ No groups found."
+        sys.stdout.write("\n📂 WhatsApp Groups List:\n" + body + "\n")
 
     def display_qr_code(self, qr_code_data):
         """Generates and displays the QR code."""
-        qr = qrcode.QRCode(box_size=2, border=1)  # Reduce box_size to shrink the QR code
+        qr = self._qr
+        qr.clear()
+        qr.version = None  # Refit from scratch rather than from the previous code's version
         qr.add_data(qr_code_data)
         qr.make(fit=True)
         print("\n📷 Scan the QR code above using WhatsApp.")
-        qr.print_ascii()
+        qr.print_ascii(out=sys.stdout)
 
     def run(self):
         """Starts the WebSocket client."""
         ws = WebSocketApp(self.server_url, on_open=self.on_open, on_message=self.on_message)
         self.ws = ws
+        threading.Thread(target=self._prompt_loop, daemon=True).start()
         ws.run_forever()
 
 
@@ -11,7 +11,11 @@ let wsClientMap = {}; // Maps wsid to { userIds: { userId: { sendMessages: boole
  */
 function startWebSocketServer(port) {
     try {
-        const wss = new WebSocket.Server({ port });
+        const wss = new WebSocket.Server({
+            port,
+            // Compress larger JSON frames (group lists, message history) for clients that negotiate it
+            perMessageDeflate: { threshold: 1024 }
+        });
         logger.logInfo('waWSserver', 'startWebSocketServer', `WebSocket server started on port ${port}`);
 
         wss.on('connection', (ws) => {
@@ -41,14 +45,42 @@ function startWebSocketServer(port) {
 
 /**
  * Handles an incoming message from a client.
+ * A message carries either a single request object or a batch of
+ * newline-delimited JSON requests (one per line).
  * @param {string} wsid - WebSocket connection ID.
  * @param {WebSocket} ws - The WebSocket client instance.
  * @param {string} message - The received message.
  */
 function handleIncomingMessage(wsid, ws, message) {
+    const text = message.toString();
+
+    let requests;
+    try {
+        requests = [JSON.parse(text)];
+    } catch (error) {
+        // Not a single JSON document; treat it as a newline-delimited batch
+        requests = [];
+        text.split('\n').filter((line) => line.trim()).forEach((line) => {
+            try {
+                requests.push(JSON.parse(line));
+            } catch (lineError) {
+                logger.logError('waWSserver', 'handleIncomingMessage', `Failed to parse message: ${lineError.message}`);
+            }
+        });
+    }
+
+    requests.forEach((data) => handleClientMessage(wsid, ws, data));
+}
+
+/**
+ * Handles a single parsed request from a client.
+ * @param {string} wsid - WebSocket connection ID.
+ * @param {WebSocket} ws - The WebSocket client instance.
+ * @param {Object} data - The parsed request.
+ */
+function handleClientMessage(wsid, ws, data) {
     try {
-        const data = JSON.parse(message);
-        if (!data.user_id || !data.event) {
+        if (!data || !data.user_id || !data.event) {
             throw new Error('Invalid message format. Must contain user_id and event.');
         }
 
@@ -120,11 +152,11 @@ function handleIncomingMessage(wsid, ws, message) {
                 break;
         }
     } catch (error) {
-        logger.logError('waWSserver', 'handleIncomingMessage', `Failed to process message: ${error.message}`);
-        if (typeof data !== 'undefined' && data.user_id) {
+        logger.logError('waWSserver', 'handleClientMessage', `Failed to process message: ${error.message}`);
+        if (data && data.user_id) {
             sendMessageToClients(data.user_id, { status: 'error', message: error.message });
         } else {
-            logger.logError('waWSserver', 'handleIncomingMessage', `Cannot send error response - user_id is undefined.`);
+            logger.logError('waWSserver', 'handleClientMessage', `Cannot send error response - user_id is undefined.`);
         }
     }
 }